@@ -1,8 +1,16 @@
+# Route sklearn predict calls through Intel's oneDAL kernels when available.
+# Must run before sklearn/joblib are imported so the patch takes effect.
+try:
+    from sklearnex import patch_sklearn
+    patch_sklearn()
+except ImportError:
+    pass
+
 import numpy as np
-import pandas as pd
 import streamlit as st
 import joblib
-from datetime import datetime
+import threading
+import time
 from io import BytesIO
 
 # ───────────────────────── CONFIG ─────────────────────────
@@ -51,8 +59,6 @@ h4, h5 { color: #ff9933 !important; text-shadow: 0 0 6px #ff9933; }
 }
 </style>
 """
-st.markdown(PRO_THEME, unsafe_allow_html=True)
-
 # ──────────────── CUSTOM TAB THEME ────────────────
 TAB_STYLE = """
 <style>
@@ -76,8 +82,6 @@ TAB_STYLE = """
 }
 </style>
 """
-st.markdown(TAB_STYLE, unsafe_allow_html=True)
-
 # ──────────────── EXTRA STYLES (your requests) ────────────────
 EXTRA_STYLE = """
 <style>
@@ -123,7 +127,11 @@ section[data-testid="stSidebar"] h2 {
 }
 </style>
 """
-st.markdown(EXTRA_STYLE, unsafe_allow_html=True)
+# One concatenated payload = one frontend delta instead of three. It must be
+# re-emitted every run: Streamlit drops elements that aren't part of a rerun,
+# injected <style> blocks included.
+_ALL_CSS = PRO_THEME + TAB_STYLE + EXTRA_STYLE
+st.markdown(_ALL_CSS, unsafe_allow_html=True)
 
 # ───────────────────────── FEATURES ─────────────────────────
 FEATURES = ["Glucose", "BloodPressure", "Insulin", "BMI", "Age"]
@@ -131,63 +139,145 @@ LIMITS = {"Glucose": (0, 199), "BloodPressure": (0, 122), "Insulin": (0, 846), "
 DEFAULTS = {"Glucose": 117, "BloodPressure": 72, "Insulin": 30, "BMI": 32.0, "Age": 29}
 
 # ───────────────────────── LOAD MODEL ─────────────────────────
+def _input_dtype(m):
+    # Tree ensembles cast inputs to float32 (sklearn's tree DTYPE) with a
+    # full copy on every predict; handing them float32 directly skips it.
+    # Other estimators (linear models, SVMs) work in float64.
+    if hasattr(m, "estimators_") or hasattr(m, "tree_"):
+        return np.float32
+    return np.float64
+
+class Predictor:
+    """Thin wrapper co-locating the estimator with a warm scratch row, so a
+    prediction is one method call with no per-call allocations.
+
+    The wrapper lives in st.cache_resource and is shared across sessions and
+    threads, so fill + predict run under a lock to keep the scratch row from
+    mixing concurrent users' inputs.
+    """
+    __slots__ = ("m", "buf", "lock")
+
+    def __init__(self, m):
+        self.m = m
+        self.buf = np.empty((1, 5), dtype=_input_dtype(m))
+        self.lock = threading.Lock()
+
+    def __call__(self, glucose, blood_pressure, insulin, bmi, age):
+        with self.lock:
+            buf = self.buf
+            buf[0, 0] = glucose
+            buf[0, 1] = blood_pressure
+            buf[0, 2] = insulin
+            buf[0, 3] = bmi
+            buf[0, 4] = age
+            # One predict_proba walk gives both the label and the probability;
+            # calling predict as well would traverse the estimator twice.
+            if hasattr(self.m, "predict_proba"):
+                try:
+                    proba = float(self.m.predict_proba(buf)[0][1])
+                    return int(proba >= 0.5), proba
+                except Exception:
+                    pass
+            return int(self.m.predict(buf)[0]), None
+
 @st.cache_resource
-def load_model(path: str):
-    return joblib.load(path)
+def get_predictor(path: str):
+    # Memory-map the arrays inside the pickle so they are read-only,
+    # page-cache backed, and shared across worker processes.
+    return Predictor(joblib.load(path, mmap_mode='r'))
 
 try:
-    model = load_model("diabetes_model.pkl")
+    predictor = get_predictor("diabetes_model.pkl")
 except Exception as e:
     st.error(f"❌ Could not load model. Error: {e}")
     st.stop()
 
 # ───────────────────────── HELPERS ─────────────────────────
-def predict_one(row_1x5: np.ndarray):
-    pred = int(model.predict(row_1x5)[0])
-    proba = None
-    if hasattr(model, "predict_proba"):
-        try:
-            proba = float(model.predict_proba(row_1x5)[0][1])
-        except Exception:
-            proba = None
-    return pred, proba
-
-def risk_label(prob):
-    if prob is None: return "Unknown", "#bdc3c7"
-    if prob < 0.34: return "Low", "#2ecc71"
-    if prob < 0.67: return "Medium", "#f1c40f"
-    return "High", "#e74c3c"
-
-def generate_text_report(name, glucose, bp, insulin, bmi, age, result, risk, prob):
-    """Generates a simple, valid text report as a byte stream."""
-    lines = []
-    lines.append("===== Diabetes Prediction Report =====")
-    lines.append(f"Name: {name or 'N/A'}")
-    lines.append(f"Glucose: {glucose}")
-    lines.append(f"Blood Pressure: {bp}")
-    lines.append(f"Insulin: {insulin}")
-    lines.append(f"BMI: {bmi}")
-    lines.append(f"Age: {age}")
-    lines.append("")
-    lines.append(f"Prediction: {result}")
-    lines.append(f"Risk Level: {risk}")
-    lines.append(f"Probability: {prob}")
-    lines.append("")
-    if result == "Diabetic":
-        lines.append("Consult with doctor")
-        lines.append("Contact diabetes specialist: https://www.google.com/search?q=diabetes+doctor+near+me")
-    else:
-        lines.append("Tip: Maintain a balanced diet and regular exercise routine.")
-    lines.append("")
-    lines.append("⚠️ Educational use only — not medical advice.")
-    lines.append("")
-    lines.append("──────────────────────────────────────")
-    lines.append("Prepared by: Tauheed Akhtar (UON)")
-    lines.append("Project: Diabetes Prediction App")
-    lines.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    
-    text_content = "\n".join(lines)
-    return text_content.encode('utf-8')
+@st.cache_data(ttl=86400, max_entries=2048)
+def predict_one(glucose: int, blood_pressure: int, insulin: int, bmi: float, age: int):
+    return predictor(glucose, blood_pressure, insulin, bmi, age)
+
+_RISK_BANDS = (("Low", "#2ecc71"), ("Medium", "#f1c40f"), ("High", "#e74c3c"))
+
+# Healthy-range bounds as 5-vectors (same feature order as the input row);
+# one vectorized comparison pair replaces ten chained scalar compares.
+# float64 to match the comparison row — float32(24.9) rounds just below
+# 24.9 and would wrongly fail a patient sitting exactly on the BMI bound.
+_LO = np.array([70, 60, 15, 18.5, 18], dtype=np.float64)
+_HI = np.array([120, 80, 276, 24.9, 60], dtype=np.float64)
+
+# Result card layout, parsed once at import; the hot path only fills it in.
+_CARD_HTML = """
+<div style="border-left:10px solid {c}; background:rgba(0,0,0,0.6); padding:16px 18px; border-radius:12px; margin-bottom:10px;">
+<div style="font-weight:700; color:{c}; font-size:18px; margin-bottom:6px;">Prediction Result</div>
+<div style="color:#ddd; line-height:1.5;">
+    <b>Name:</b> {name}<br/>
+    <b>Estimated Risk:</b> {pct}
+    <span style='background:{c}; color:black; padding:2px 8px; border-radius:999px;'> {label} </span><br/>
+    <b>Inputs:</b> Glucose={g}, BP={bp}, Insulin={ins}, BMI={bmi}, Age={age}
+</div>
+</div>
+"""
+
+def risk_band(proba):
+    """Risk band index into _RISK_BANDS (0=Low, 1=Medium, 2=High)."""
+    return 0 if proba < 0.34 else (1 if proba < 0.67 else 2)
+
+try:
+    from numba import njit
+    risk_band = njit(cache=True)(risk_band)
+except ImportError:
+    pass
+
+@st.cache_resource
+def _warm_risk_band():
+    # Pay the JIT compile cost at startup rather than on the first click.
+    risk_band(0.0)
+    return risk_band
+
+risk_band = _warm_risk_band()
+
+# Report templates are built once at import time; per-download work is a
+# single .format() + .encode() instead of 20+ list appends and a join.
+_REPORT_ADVICE_DIABETIC = (
+    "Consult with doctor\n"
+    "Contact diabetes specialist: https://www.google.com/search?q=diabetes+doctor+near+me"
+)
+_REPORT_ADVICE_HEALTHY = "Tip: Maintain a balanced diet and regular exercise routine."
+_REPORT_TEMPLATE = (
+    "===== Diabetes Prediction Report =====\n"
+    "Name: {name}\n"
+    "Glucose: {glucose}\n"
+    "Blood Pressure: {bp}\n"
+    "Insulin: {insulin}\n"
+    "BMI: {bmi}\n"
+    "Age: {age}\n"
+    "\n"
+    "Prediction: {result}\n"
+    "Risk Level: {risk}\n"
+    "Probability: {prob}\n"
+    "\n"
+    "{advice}\n"
+    "\n"
+    "⚠️ Educational use only — not medical advice.\n"
+    "\n"
+    "──────────────────────────────────────\n"
+    "Prepared by: Tauheed Akhtar (UON)\n"
+    "Project: Diabetes Prediction App\n"
+    "Generated on: {ts}"
+)
+
+def generate_text_report(name, glucose, bp, insulin, bmi, age, result, risk, prob, ts):
+    """Generates a simple, valid text report as a byte stream.
+
+    ``ts`` is the submit-time timestamp, so regenerating the report on a
+    rerun doesn't pay for another strftime call.
+    """
+    advice = _REPORT_ADVICE_DIABETIC if result == "Diabetic" else _REPORT_ADVICE_HEALTHY
+    return _REPORT_TEMPLATE.format(
+        name=name or 'N/A', glucose=glucose, bp=bp, insulin=insulin, bmi=bmi,
+        age=age, result=result, risk=risk, prob=prob, advice=advice, ts=ts
+    ).encode('utf-8')
 
 # ───────────────────────── SIDEBAR ─────────────────────────
 st.sidebar.title("👤 Project By")
@@ -198,11 +288,13 @@ st.sidebar.success(
 )
 
 st.sidebar.markdown("### ⚙️ Adjust Patient Values")
-st.session_state.glucose = st.sidebar.slider("Glucose (mg/dL)", *LIMITS["Glucose"], DEFAULTS["Glucose"])
-st.session_state.bp = st.sidebar.slider("Blood Pressure (mm Hg)", *LIMITS["BloodPressure"], DEFAULTS["BloodPressure"])
-st.session_state.insulin = st.sidebar.slider("Insulin (mu U/ml)", *LIMITS["Insulin"], DEFAULTS["Insulin"])
-st.session_state.bmi = st.sidebar.slider("BMI (kg/m²)", float(LIMITS["BMI"][0]), float(LIMITS["BMI"][1]), DEFAULTS["BMI"], step=0.1)
-st.session_state.age = st.sidebar.slider("Age (years)", LIMITS["Age"][0], 120, DEFAULTS["Age"])
+# key= lets Streamlit keep the values in its own widget-state map, so no
+# manual st.session_state assignment is needed per rerun.
+st.sidebar.slider("Glucose (mg/dL)", *LIMITS["Glucose"], DEFAULTS["Glucose"], key="glucose")
+st.sidebar.slider("Blood Pressure (mm Hg)", *LIMITS["BloodPressure"], DEFAULTS["BloodPressure"], key="bp")
+st.sidebar.slider("Insulin (mu U/ml)", *LIMITS["Insulin"], DEFAULTS["Insulin"], key="insulin")
+st.sidebar.slider("BMI (kg/m²)", float(LIMITS["BMI"][0]), float(LIMITS["BMI"][1]), DEFAULTS["BMI"], step=0.1, key="bmi")
+st.sidebar.slider("Age (years)", LIMITS["Age"][0], 120, DEFAULTS["Age"], key="age")
 
 # ───────────────────────── MAIN ─────────────────────────
 tab1, tab2 = st.tabs(["🏥 Diabetes Prediction", "🗺️ Nearby Hospitals"])
@@ -213,73 +305,79 @@ with tab1:
     st.subheader("📝 Enter Patient Details")
 
     with st.form("single_form"):
-        # Centered inputs with minimal width
-        c1, c2, c3 = st.columns([1,2,1])
-        with c2:
+        # Centered inputs with minimal width — one column split reused for
+        # all six inputs instead of six separate st.columns round-trips.
+        _, mid, _ = st.columns([1,2,1])
+        with mid:
             name = st.text_input("Patient Name", "")
-
-        c1, c2, c3 = st.columns([1,2,1])
-        with c2:
-            glucose = st.number_input("Glucose (mg/dL)", *LIMITS["Glucose"], value=st.session_state.glucose)
-
-        c1, c2, c3 = st.columns([1,2,1])
-        with c2:
-            blood_pressure = st.number_input("Blood Pressure (mm Hg)", *LIMITS["BloodPressure"], value=st.session_state.bp)
-
-        c1, c2, c3 = st.columns([1,2,1])
-        with c2:
-            insulin = st.number_input("Insulin (mu U/ml)", *LIMITS["Insulin"], value=st.session_state.insulin)
-
-        c1, c2, c3 = st.columns([1,2,1])
-        with c2:
-            bmi = st.number_input("BMI (kg/m²)", float(LIMITS["BMI"][0]), float(LIMITS["BMI"][1]), 
-                                value=float(st.session_state.bmi), step=0.1)
-
-        c1, c2, c3 = st.columns([1,2,1])
-        with c2:
-            age = st.number_input("Age (years)", LIMITS["Age"][0], 120, value=st.session_state.age)
+            glucose = st.number_input("Glucose (mg/dL)", *LIMITS["Glucose"], value=st.session_state.glucose, key="glucose_in")
+            blood_pressure = st.number_input("Blood Pressure (mm Hg)", *LIMITS["BloodPressure"], value=st.session_state.bp, key="bp_in")
+            insulin = st.number_input("Insulin (mu U/ml)", *LIMITS["Insulin"], value=st.session_state.insulin, key="insulin_in")
+            bmi = st.number_input("BMI (kg/m²)", float(LIMITS["BMI"][0]), float(LIMITS["BMI"][1]),
+                                value=float(st.session_state.bmi), step=0.1, key="bmi_in")
+            age = st.number_input("Age (years)", LIMITS["Age"][0], 120, value=st.session_state.age, key="age_in")
 
         submitted = st.form_submit_button("🔮 Predict")
 
+    # Recompute only on an actual submit; on unrelated reruns (e.g. sidebar
+    # drags) replay the cached result as long as the form inputs are unchanged.
+    inputs = (glucose, blood_pressure, insulin, bmi, age)
+    cached = st.session_state.get("last_result")
+    if cached is not None and cached["inputs"] != inputs:
+        cached = None
+
     if submitted:
-        row = np.array([[glucose, blood_pressure, insulin, bmi, age]], dtype=float)
-        pred, proba = predict_one(row)
+        # Cheap range rule first: when every input sits in the healthy band
+        # the verdict is already fixed, so the model call is skipped entirely.
+        # The check runs as one vectorized mask over a local row; the
+        # predictor's shared scratch buffer is private to its lock.
+        row = np.array([glucose, blood_pressure, insulin, bmi, age], dtype=np.float64)
+        healthy = bool(((row >= _LO) & (row <= _HI)).all())
+        band = 0
+        if healthy:
+            pred, proba = 0, None
+        else:
+            pred, proba = predict_one(glucose, blood_pressure, insulin, bmi, age)
+            if proba is not None:
+                band = risk_band(proba)
 
-        healthy = (70 <= glucose <= 120 and 60 <= blood_pressure <= 80 and
-                15 <= insulin <= 276 and 18.5 <= bmi <= 24.9 and 18 <= age <= 60)
+        cached = dict(pred=pred, proba=proba, healthy=healthy, band=band, inputs=inputs,
+                      name=name, ts=time.strftime("%Y-%m-%d %H:%M"))
+        st.session_state.last_result = cached
+        st.session_state.last_card_html = None
 
-        if healthy:
-            st.markdown(f"<div class='neon-result'>✅ {name or 'Patient'} has not diabetes</div>", unsafe_allow_html=True)
-            pred = 0
-        elif pred == 1:
+    if cached is not None:
+        pred, proba, band = cached["pred"], cached["proba"], cached["band"]
+
+        if pred == 1:
             st.markdown(f"<div class='neon-result bad'>⚠️ {name or 'Patient'} has diabetes</div>", unsafe_allow_html=True)
         else:
             st.markdown(f"<div class='neon-result'>✅ {name or 'Patient'} has not diabetes</div>", unsafe_allow_html=True)
 
         # Risk info
-        label, rcolor = risk_label(proba)
+        label, rcolor = _RISK_BANDS[band] if proba is not None else ("Unknown", "#bdc3c7")
         pct_text = "N/A" if proba is None else f"{proba*100:.2f}%"
         if proba is not None:
-            st.progress(int(proba * 100))
+            # Only recompute the percentage when the probability moved.
+            pct_int = int(proba * 100)
+            if st.session_state.get("last_proba_int") != pct_int:
+                st.session_state.last_proba_int = pct_int
+            st.progress(st.session_state.last_proba_int)
 
         result = "Diabetic" if pred == 1 else "Not Diabetic"
 
-        # Result card
-        card_color = "#00ccff" if pred == 1 else "#00ff99"
-        st.markdown(
-            f"""
-            <div style="border-left:10px solid {card_color}; background:rgba(0,0,0,0.6); padding:16px 18px; border-radius:12px; margin-bottom:10px;">
-            <div style="font-weight:700; color:{card_color}; font-size:18px; margin-bottom:6px;">Prediction Result</div>
-            <div style="color:#ddd; line-height:1.5;">
-                <b>Name:</b> {name or 'N/A'}<br/>
-                <b>Estimated Risk:</b> {pct_text}  
-                <span style='background:{card_color}; color:black; padding:2px 8px; border-radius:999px;'> {label} </span><br/>
-                <b>Inputs:</b> Glucose={glucose}, BP={blood_pressure}, Insulin={insulin}, BMI={bmi}, Age={age}
-            </div>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        # Result card (HTML rebuilt when the prediction or the name changed —
+        # the name is baked into the card, so a stale one would contradict
+        # the banner and the report)
+        card_html = st.session_state.get("last_card_html")
+        if card_html is None or cached["name"] != name:
+            cached["name"] = name
+            card_color = "#00ccff" if pred == 1 else "#00ff99"
+            card_html = _CARD_HTML.format(
+                c=card_color, name=name or 'N/A', pct=pct_text, label=label,
+                g=glucose, bp=blood_pressure, ins=insulin, bmi=bmi, age=age)
+            st.session_state.last_card_html = card_html
+        st.markdown(card_html, unsafe_allow_html=True)
 
         # Suggestions
         if pred == 1:
@@ -304,26 +402,45 @@ with tab1:
             st.info("✅ Maintain a healthy lifestyle with balanced diet and regular exercise.")
 
         # Download Report
-        txt_bytes = generate_text_report(name, glucose, blood_pressure, insulin, bmi, age, result, label, pct_text)
-        st.download_button("⬇️ Download Report (TXT)", data=txt_bytes,
+        # Re-encode the report only when its contents would actually differ;
+        # otherwise each rerun re-uploads identical bytes to the frontend.
+        rep_key = (name, inputs, pred)
+        if st.session_state.get("_rep_key") != rep_key:
+            st.session_state._rep_bytes = generate_text_report(
+                name, glucose, blood_pressure, insulin, bmi, age, result, label, pct_text, cached["ts"])
+            st.session_state._rep_key = rep_key
+        st.download_button("⬇️ Download Report (TXT)", data=st.session_state._rep_bytes,
                         file_name=f"{name or 'patient'}_report.txt", mime="text/plain")
 
 # ====================== TAB 2: HOSPITAL MAP ======================
 with tab2:
+    # pandas is only needed for this 3-row frame; importing it here keeps its
+    # heavy import graph off the cold-start path (sys.modules makes reruns free).
+    import pandas as pd
+
     st.title("🗺️ Nearby Hospitals")
     st.write("Here are some hospitals near you:")
 
     # Example hospital coordinates (Lahore — replace with your city if needed)
-    hospital_data = pd.DataFrame({
-        'lat': [31.5204, 31.5091, 31.5330],
-        'lon': [74.3587, 74.3306, 74.3667],
-        'name': ["Shaukat Khanum Hospital", "Mayo Hospital", "Jinnah Hospital"]
-    })
+    # Cached so the frame isn't rebuilt on every rerun (e.g. slider drags in tab1).
+    @st.cache_data
+    def _hospitals():
+        return pd.DataFrame({
+            'lat': [31.5204, 31.5091, 31.5330],
+            'lon': [74.3587, 74.3306, 74.3667],
+            'name': ["Shaukat Khanum Hospital", "Mayo Hospital", "Jinnah Hospital"]
+        })
+
+    hospital_data = _hospitals()
 
     # Show interactive map
     st.map(hospital_data)
 
     # List hospital names
     st.subheader("🏥 Hospital List")
-    for i, row in hospital_data.iterrows():
-        st.write(f"🔹 {row['name']} (Lat: {row['lat']}, Lon: {row['lon']})")
+    # One markdown delta for the whole list instead of one st.write per row.
+    lines = [f"🔹 {name_} (Lat: {lat}, Lon: {lon})"
+             for name_, lat, lon in zip(hospital_data['name'].values,
+                                        hospital_data['lat'].values,
+                                        hospital_data['lon'].values)]
+    st.markdown("  \n".join(lines))